@@ -0,0 +1,79 @@
+######################################
+# --- PROYECTO PARA TFG DE LA UNIR ---
+# Autor: Francisco Javier Ortiz Gonzalez
+# Fecha: Diciembre, 2025
+# Licencia: AGPL_v3
+######################################
+
+# Cliente del modo servicio (tfg_servicio_montessori_v1.py).
+# No importa ultralytics ni torch, por lo que enviar un trabajo es inmediato.
+#
+# Uso:
+#   python tfg_cliente_servicio_v1.py enviar trabajo.json    -> encola un trabajo (fichero JSON)
+#   python tfg_cliente_servicio_v1.py estado [id_trabajo]    -> estado de uno o de todos los trabajos
+#   python tfg_cliente_servicio_v1.py detener                -> detiene el servicio
+
+import json
+import socket
+import sys
+
+##################################
+# --- PARAMETROS CONFIGURABLES ---
+##################################
+
+# Dirección del socket local donde escucha el servicio
+HOST_SERVICIO = "127.0.0.1"
+PUERTO_SERVICIO = 50505
+
+
+###############################
+# --- FUNCIONES AUXILIARES ---
+###############################
+
+def enviar_peticion(peticion, HOST_SERVICIO, PUERTO_SERVICIO):
+    """Envía una petición JSON al servicio y devuelve su respuesta."""
+
+    with socket.create_connection((HOST_SERVICIO, PUERTO_SERVICIO)) as conexion:
+        conexion.sendall((json.dumps(peticion) + "\n").encode("utf-8"))
+        respuesta = conexion.makefile("rb").readline()
+
+    if not respuesta:
+        raise ValueError("El servicio cerró la conexión sin responder.")
+    return json.loads(respuesta.decode("utf-8"))
+
+
+##############################
+# --- MAIN PRINCIPAL CLIENTE ---
+##############################
+
+def main():
+
+    orden = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if orden == "enviar" and len(sys.argv) > 2:
+        with open(sys.argv[2], encoding="utf-8") as f:
+            peticion = json.load(f)
+        peticion["accion"] = "procesar"
+    elif orden == "estado":
+        peticion = {"accion": "estado"}
+        if len(sys.argv) > 2:
+            peticion["id"] = sys.argv[2]
+    elif orden == "detener":
+        peticion = {"accion": "detener"}
+    else:
+        print("Uso: python tfg_cliente_servicio_v1.py enviar <trabajo.json> | estado [id_trabajo] | detener")
+        return
+
+    try:
+        respuesta = enviar_peticion(peticion, HOST_SERVICIO, PUERTO_SERVICIO)
+    except OSError as e:
+        print("No se pudo conectar con el servicio en {}:{}. Error: {}".format(HOST_SERVICIO, PUERTO_SERVICIO, e))
+        return
+    except ValueError as e:   # incluye json.JSONDecodeError
+        print("Respuesta no válida del servicio en {}:{}. Error: {}".format(HOST_SERVICIO, PUERTO_SERVICIO, e))
+        return
+
+    print(json.dumps(respuesta, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
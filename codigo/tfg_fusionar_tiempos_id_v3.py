@@ -9,6 +9,10 @@ import csv
 import os
 from collections import defaultdict
 
+import numpy as np
+
+from tfg_log_binario_v1 import leer_log_binario
+
 #####################################
 # --- PARA LA GENERACIÓN DE RUTAS ---
 #####################################
@@ -22,6 +26,9 @@ OUTPUT_HIL_DIR = os.path.join(RUTA_RAIZ_PROYECTO, "HIL_ID")
 # Archivo de log de detecciones
 OUTPUT_HIL_LOG = os.path.join(OUTPUT_HIL_DIR, "id_detection_log.csv") 
 
+# Archivo de log de detecciones en formato binario
+OUTPUT_HIL_LOG_BIN = os.path.join(OUTPUT_HIL_DIR, "id_detection_log.bin") 
+
 # Archivo de sealida con los tiempos fusionados
 OUTPUT_FUSION_CSV = os.path.join(RUTA_RAIZ_PROYECTO, "estadisticas", "tiempos_id_fusionados.csv")
 
@@ -72,6 +79,29 @@ def mapear_logs_a_id_final(hil_dir):
     return id_mapa
 
 
+def seleccionar_formato_log(ruta_csv, ruta_bin):
+    """
+    Decide qué log fusionar según los archivos existentes, sin depender de que la configuración
+    coincida con FORMATO_LOG_HIL del prototipo. Si existen ambos se usa el más reciente y se avisa.
+    Devuelve "csv", "binario" o None si no existe ninguno.
+    """
+
+    existe_csv = os.path.exists(ruta_csv)
+    existe_bin = os.path.exists(ruta_bin)
+
+    if existe_csv and existe_bin:
+        formato = "binario" if os.path.getmtime(ruta_bin) >= os.path.getmtime(ruta_csv) else "csv"
+        print("AVISO: existen los logs CSV ({}) y binario ({}). Se usa el más reciente: {}".format(
+            ruta_csv, ruta_bin, formato))
+        return formato
+    if existe_bin:
+        return "binario"
+    if existe_csv:
+        return "csv"
+
+    print("Error: no se encontró ningún log de detecciones ({} ni {})".format(ruta_csv, ruta_bin))
+    return None
+
 def cargar_y_sumar_tiempos(log_ruta, id_mapa): 
     """
     Carga el log de detecciones y suma los tiempos de permanencia segun datos asociados al idLog
@@ -164,6 +194,75 @@ def cargar_y_sumar_tiempos(log_ruta, id_mapa):
     
     return dic_tiempos_fusionados
 
+def cargar_y_sumar_tiempos_binario(log_ruta, id_mapa):
+    """
+    Equivalente a cargar_y_sumar_tiempos para el log binario, con la misma lógica delta y de reseteo del tracker.
+    El log se lee con numpy.memmap y los deltas se calculan por columnas en vez de fila a fila.
+    Devuelve (tiempos_fusionados, nombres_zonas), ya que las zonas se leen de la cabecera del log.
+    """
+
+    dic_tiempos_fusionados = defaultdict(dict)
+
+    if not os.path.exists(log_ruta):
+        print("Error: Archivo de log no encontrado en {}".format(log_ruta))
+        return dic_tiempos_fusionados, HEADERS_ZONAS
+
+    print("Cargando log binario desde: {}".format(log_ruta))
+
+    try:
+        zonas, registros = leer_log_binario(log_ruta)
+    except ValueError as e:
+        print("Error al leer el log binario: {}".format(e))
+        return dic_tiempos_fusionados, HEADERS_ZONAS
+
+    # Asociamos cada idLog con su ID_FINAL (revisado por humano) mediante búsqueda binaria sobre el mapa ordenado
+    mapa_ids_log = np.array(sorted(id_mapa), dtype=np.int64)
+    mapa_ids_final = np.array([id_mapa[id_log] for id_log in mapa_ids_log], dtype=np.int64)
+    ids_log = np.asarray(registros["idLog"])
+
+    posiciones = np.minimum(np.searchsorted(mapa_ids_log, ids_log), max(len(mapa_ids_log) - 1, 0))
+    en_mapa = (mapa_ids_log[posiciones] == ids_log) if len(mapa_ids_log) else np.zeros(len(ids_log), dtype=bool)
+
+    # Los idLog que no están en el mapa se borraron intencionadamente por el humano, se ignoran
+    # (igual que en la versión CSV, tampoco cuentan como último valor guardado de su ID_tracker)
+    ids_final = mapa_ids_final[posiciones[en_mapa]]
+    ids_tracker = np.asarray(registros["idPersona"])[en_mapa]
+
+    # Ordenamos por ID_tracker conservando el orden del log dentro de cada ID (orden estable)
+    orden = np.argsort(ids_tracker, kind="stable")
+    ids_tracker = ids_tracker[orden]
+    ids_final = ids_final[orden]
+    inicio_grupo = np.ones(len(ids_tracker), dtype=bool)
+    inicio_grupo[1:] = ids_tracker[1:] != ids_tracker[:-1]
+
+    ids_final_unicos, indice_final = np.unique(ids_final, return_inverse=True)
+
+    for zona in zonas:
+        valor_actual_del_log = np.asarray(registros[zona])[en_mapa][orden]
+
+        # El último valor guardado es el de la fila anterior del mismo ID_tracker (0 en su primera fila)
+        ultimo_valor_guardado = np.empty_like(valor_actual_del_log)
+        ultimo_valor_guardado[1:] = valor_actual_del_log[:-1]
+        ultimo_valor_guardado[inicio_grupo] = 0.0
+
+        # Si el valor actual es MENOR que el anterior el tracker se reinició y el delta es el valor actual
+        tiempo_delta = np.where(valor_actual_del_log < ultimo_valor_guardado,
+                                valor_actual_del_log, valor_actual_del_log - ultimo_valor_guardado)
+
+        # Sumamos los deltas al ID_FINAL verificado por el humano
+        total_por_id = np.zeros(len(ids_final_unicos))
+        np.add.at(total_por_id, indice_final, tiempo_delta)
+        for id_final, total in zip(ids_final_unicos.tolist(), total_por_id.tolist()):
+            dic_tiempos_fusionados[id_final][zona] = total
+
+    print("\n--- RESUMEN ---")
+    print("Registros totales en el log: {}".format(len(registros)))
+    print("Logs procesados: {}".format(int(en_mapa.sum())))
+    print("IDs de persona consolidados: {}".format(len(dic_tiempos_fusionados)))
+    print("---------------")
+
+    return dic_tiempos_fusionados, zonas
+
 def guardar_tiempos_fusionados(tiempos_fusionados, ruta_archivo_fusion, zonas):
     """
     Guarda los tiempos totales de permanencia por ID de persona en un nuevo archivo CSV.
@@ -204,11 +303,19 @@ def main():
         print("No se encontraron imágenes en las carpetas ID_X para procesar.")
         return
     
+    # Elige el log a fusionar según los archivos existentes
+    formato_log = seleccionar_formato_log(OUTPUT_HIL_LOG, OUTPUT_HIL_LOG_BIN)
+    if formato_log is None:
+        return
+    
     # Carga y suma los tiempos, usando el mapa para determinar el ID final tras revisión humana
-    tiempos_consolidados = cargar_y_sumar_tiempos(OUTPUT_HIL_LOG, id_mapa)
+    if formato_log == "binario":
+        tiempos_consolidados, zonas = cargar_y_sumar_tiempos_binario(OUTPUT_HIL_LOG_BIN, id_mapa)
+    else:
+        tiempos_consolidados, zonas = cargar_y_sumar_tiempos(OUTPUT_HIL_LOG, id_mapa), HEADERS_ZONAS
     
     # Guarda el nuevo CSV con los resultados fusionados
-    guardar_tiempos_fusionados(tiempos_consolidados, OUTPUT_FUSION_CSV, HEADERS_ZONAS)
+    guardar_tiempos_fusionados(tiempos_consolidados, OUTPUT_FUSION_CSV, zonas)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,242 @@
+######################################
+# --- PROYECTO PARA TFG DE LA UNIR ---
+# Autor: Francisco Javier Ortiz Gonzalez
+# Fecha: Diciembre, 2025
+# Licencia: AGPL_v3
+######################################
+
+# LOG BINARIO DE DETECCIONES: alternativa al id_detection_log.csv
+# Guarda registros de tamaño fijo (idLog, idPersona, frame y un float64 por zona con el tiempo acumulado
+# sin redondear) precedidos de una cabecera que describe las columnas de zona.
+# Se lee sin copiar el archivo a memoria mediante numpy.memmap.
+#
+# Estructura del archivo (little-endian):
+#   Cabecera:  IDENTIFICADOR (8 bytes) | versión (uint32) | nº zonas (uint32) | tamaño cabecera (uint32) | reservado (uint32)
+#              + nombre de cada zona en UTF-8 rellenado con ceros hasta LONGITUD_NOMBRE_ZONA bytes
+#   Registros: idLog (int64) | idPersona (int64) | frame (int64) | zona1 (float64) | ... | zonaN (float64)
+#
+# Conversión de sesiones antiguas:
+#   python tfg_log_binario_v1.py a_binario id_detection_log.csv id_detection_log.bin
+#   python tfg_log_binario_v1.py a_csv id_detection_log.bin id_detection_log.csv
+
+import csv
+import os
+import struct
+import sys
+
+import numpy as np
+
+##################################
+# --- PARAMETROS CONFIGURABLES ---
+##################################
+
+# Identificador y versión del formato
+IDENTIFICADOR_LOG = b"TFGLOGB\x00"
+VERSION_LOG = 1
+
+# Cabecera fija: identificador, versión, nº zonas, tamaño total de cabecera, reservado
+FORMATO_CABECERA = "<8sIIII"
+
+# Bytes reservados para el nombre de cada zona
+LONGITUD_NOMBRE_ZONA = 32
+
+# Número de registros que se acumulan en memoria antes de escribirlos a disco
+TAMANO_BLOQUE = 256
+
+# Valor de frame usado cuando no se conoce (logs convertidos desde CSV)
+FRAME_DESCONOCIDO = -1
+
+# Formatos admitidos para el log de detecciones (FORMATO_LOG_HIL)
+FORMATOS_LOG_HIL = ("csv", "binario")
+
+
+###############################
+# --- FUNCIONES AUXILIARES ---
+###############################
+
+def comprobar_formato_log(formato_log):
+    """Lanza ValueError si el formato de log indicado no es uno de los admitidos."""
+    if formato_log not in FORMATOS_LOG_HIL:
+        raise ValueError("Formato de log desconocido: '{}'. Valores admitidos: {}".format(
+            formato_log, ", ".join(FORMATOS_LOG_HIL)))
+
+def tipo_registro(nombres_zonas):
+    """Devuelve el tipo de numpy de un registro del log para las zonas indicadas."""
+    campos = [("idLog", "<i8"), ("idPersona", "<i8"), ("frame", "<i8")]
+    campos += [(nombre, "<f8") for nombre in nombres_zonas]
+    return np.dtype(campos)
+
+def crear_cabecera(nombres_zonas):
+    """Genera los bytes de la cabecera, ajustando su tamaño a múltiplo de 8 para alinear los registros."""
+
+    nombres = b""
+    for nombre in nombres_zonas:
+        nombre_bytes = nombre.encode("utf-8")
+        if len(nombre_bytes) >= LONGITUD_NOMBRE_ZONA:
+            raise ValueError("El nombre de zona '{}' supera {} bytes.".format(nombre, LONGITUD_NOMBRE_ZONA - 1))
+        nombres += nombre_bytes.ljust(LONGITUD_NOMBRE_ZONA, b"\x00")
+
+    tamano_cabecera = struct.calcsize(FORMATO_CABECERA) + len(nombres)
+    tamano_cabecera += (-tamano_cabecera) % 8
+
+    cabecera = struct.pack(FORMATO_CABECERA, IDENTIFICADOR_LOG, VERSION_LOG, len(nombres_zonas), tamano_cabecera, 0)
+    return (cabecera + nombres).ljust(tamano_cabecera, b"\x00")
+
+def leer_cabecera(ruta_log):
+    """Lee la cabecera del log binario y devuelve (nombres_zonas, tamano_cabecera)."""
+
+    tamano_fijo = struct.calcsize(FORMATO_CABECERA)
+
+    with open(ruta_log, "rb") as f:
+        fija = f.read(tamano_fijo)
+        if len(fija) < tamano_fijo:
+            raise ValueError("El archivo {} no contiene una cabecera válida.".format(ruta_log))
+
+        identificador, version, num_zonas, tamano_cabecera, _ = struct.unpack(FORMATO_CABECERA, fija)
+        if identificador != IDENTIFICADOR_LOG:
+            raise ValueError("El archivo {} no es un log binario de detecciones.".format(ruta_log))
+        if version != VERSION_LOG:
+            raise ValueError("Versión de log binario no soportada: {}".format(version))
+
+        if tamano_cabecera < tamano_fijo + num_zonas * LONGITUD_NOMBRE_ZONA:
+            raise ValueError("Tamaño de cabecera no válido en {}: {} bytes para {} zonas.".format(
+                ruta_log, tamano_cabecera, num_zonas))
+
+        nombres = f.read(num_zonas * LONGITUD_NOMBRE_ZONA)
+        if len(nombres) != num_zonas * LONGITUD_NOMBRE_ZONA:
+            raise ValueError("Cabecera incompleta en {}: faltan nombres de zona.".format(ruta_log))
+
+    nombres_zonas = [nombres[i:i + LONGITUD_NOMBRE_ZONA].rstrip(b"\x00").decode("utf-8")
+                     for i in range(0, len(nombres), LONGITUD_NOMBRE_ZONA)]
+    return nombres_zonas, tamano_cabecera
+
+def leer_log_binario(ruta_log):
+    """
+    Abre el log binario mediante numpy.memmap (sin copiar los datos a memoria).
+    Devuelve (nombres_zonas, registros), siendo registros un array estructurado de sólo lectura.
+    Si el último registro quedó incompleto (p.ej. por un corte durante la escritura) se ignora.
+    """
+
+    nombres_zonas, tamano_cabecera = leer_cabecera(ruta_log)
+    dtype = tipo_registro(nombres_zonas)
+    num_registros = (os.path.getsize(ruta_log) - tamano_cabecera) // dtype.itemsize
+
+    # numpy.memmap no admite mapear 0 bytes
+    if num_registros <= 0:
+        return nombres_zonas, np.zeros(0, dtype=dtype)
+
+    registros = np.memmap(ruta_log, dtype=dtype, mode="r", offset=tamano_cabecera, shape=(num_registros,))
+    return nombres_zonas, registros
+
+
+#################################
+# --- ESCRITURA DEL LOG BINARIO ---
+#################################
+
+class EscritorLogBinario:
+    """
+    Acumula registros en un bloque en memoria y los añade al archivo cuando el bloque se llena.
+    Es necesario llamar a cerrar() al terminar para volcar el último bloque.
+    """
+
+    def __init__(self, ruta_log, nombres_zonas, tamano_bloque=TAMANO_BLOQUE):
+        self.ruta_log = ruta_log
+        self.nombres_zonas = list(nombres_zonas)
+        self.bloque = np.zeros(tamano_bloque, dtype=tipo_registro(self.nombres_zonas))
+        self.num_pendientes = 0
+
+        # Se crea el archivo con la cabecera, sobrescribiendo el de una ejecución anterior
+        with open(ruta_log, "wb") as f:
+            f.write(crear_cabecera(self.nombres_zonas))
+
+    def anadir(self, idLog, idPersona, frame, tiempos):
+        """Añade un registro; tiempos es la lista de tiempos acumulados en el orden de nombres_zonas."""
+
+        self.bloque[self.num_pendientes] = (idLog, idPersona, frame, *tiempos)
+        self.num_pendientes += 1
+        if self.num_pendientes == len(self.bloque):
+            self.volcar()
+
+    def volcar(self):
+        """Escribe a disco los registros pendientes del bloque."""
+
+        if self.num_pendientes == 0:
+            return
+        with open(self.ruta_log, "ab") as f:
+            f.write(self.bloque[:self.num_pendientes].tobytes())
+        self.num_pendientes = 0
+
+    def cerrar(self):
+        self.volcar()
+
+
+###########################
+# --- CONVERSIÓN CSV/BIN ---
+###########################
+
+def convertir_csv_a_binario(ruta_csv, ruta_bin):
+    """
+    Convierte un id_detection_log.csv al formato binario. El frame se guarda como desconocido (-1).
+    Las filas con formato incorrecto se informan y se omiten, igual que en la fusión de tiempos.
+    """
+
+    with open(ruta_csv, mode="r", newline="") as infile:
+        reader = csv.reader(infile)
+        headers = next(reader, None)
+        if headers is None or len(headers) < 3:
+            raise ValueError("El archivo {} no tiene la cabecera esperada (idLog, idPersona, zonas...).".format(ruta_csv))
+        nombres_zonas = headers[2:]
+
+        escritor = EscritorLogBinario(ruta_bin, nombres_zonas)
+        total_filas = 0
+        total_convertidas = 0
+        for row in reader:
+            total_filas += 1
+            try:
+                if len(row) != len(headers):
+                    raise ValueError("se esperaban {} columnas y hay {}".format(len(headers), len(row)))
+                tiempos = [float(valor.strip().replace(",", ".")) for valor in row[2:]]
+                escritor.anadir(int(row[0]), int(row[1]), FRAME_DESCONOCIDO, tiempos)
+                total_convertidas += 1
+            except ValueError as e:
+                print(f"ERROR DE FORMATO en fila {total_filas}. Error: {e}")
+                continue
+        escritor.cerrar()
+
+    print("Convertidas {} de {} filas de {} a {}".format(total_convertidas, total_filas, ruta_csv, ruta_bin))
+
+def convertir_binario_a_csv(ruta_bin, ruta_csv):
+    """Convierte un log binario a id_detection_log.csv, conservando la precisión completa de los tiempos."""
+
+    nombres_zonas, registros = leer_log_binario(ruta_bin)
+
+    with open(ruta_csv, mode="w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(["idLog", "idPersona"] + nombres_zonas)
+        for registro in registros:
+            writer.writerow([int(registro["idLog"]), int(registro["idPersona"])] +
+                            [float(registro[zona]) for zona in nombres_zonas])
+
+    print("Convertidos {} registros de {} a {}".format(len(registros), ruta_bin, ruta_csv))
+
+
+##################################
+# --- MAIN PRINCIPAL CONVERSIÓN ---
+##################################
+
+def main():
+
+    if len(sys.argv) != 4 or sys.argv[1] not in ("a_binario", "a_csv"):
+        print("Uso: python tfg_log_binario_v1.py a_binario <log.csv> <log.bin> | a_csv <log.bin> <log.csv>")
+        return
+
+    try:
+        if sys.argv[1] == "a_binario":
+            convertir_csv_a_binario(sys.argv[2], sys.argv[3])
+        else:
+            convertir_binario_a_csv(sys.argv[2], sys.argv[3])
+    except (OSError, ValueError) as e:
+        print("Error en la conversión: {}".format(e))
+
+if __name__ == "__main__":
+    main()
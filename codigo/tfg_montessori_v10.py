@@ -13,6 +13,7 @@ from ultralytics import YOLO
 import numpy as np 
 import os 
 import sys 
+from tfg_log_binario_v1 import EscritorLogBinario, comprobar_formato_log
 
 #####################################
 # --- PARA LA GENERACIÓN DE RUTAS ---
@@ -57,6 +58,12 @@ OUTPUT_HIL_DIR = os.path.join(RUTA_RAIZ_PROYECTO, "HIL_ID")
 # Archivo de log de detecciones
 OUTPUT_HIL_LOG = os.path.join(OUTPUT_HIL_DIR, "id_detection_log.csv") 
 
+# Formato del log de detecciones: "csv" (tiempos redondeados a 2 decimales) o "binario" (tiempos float64, ver tfg_log_binario_v1.py)
+FORMATO_LOG_HIL = "csv"
+
+# Archivo de log de detecciones en formato binario
+OUTPUT_HIL_LOG_BIN = os.path.join(OUTPUT_HIL_DIR, "id_detection_log.bin") 
+
 # Modelo de detección utilizado
 MODELO_DETECCION = os.path.join(RUTA_RAIZ_PROYECTO,"yolo","yolov8s.pt")
 
@@ -70,6 +77,7 @@ print("Ruta final del archivo estadísticas (OUTPUT_CSV_FILE):", OUTPUT_CSV_FILE
 print("Ruta final del video etiquetado (OUTPUT_VIDEO_FILE):", OUTPUT_VIDEO_FILE) 
 print("Ruta final del carpeta HIL_ID (OUTPUT_HIL_DIR):", OUTPUT_HIL_DIR)
 print("Ruta final del log de capturas (OUTPUT_VIDEO_FILE):", OUTPUT_HIL_LOG) 
+print("Ruta final del log binario de capturas (OUTPUT_HIL_LOG_BIN):", OUTPUT_HIL_LOG_BIN) 
 print("Ruta final del modelo YOLO (MODELO_DETECCION):", MODELO_DETECCION)
 print("Ruta final del tracker (TRACKER_CONFIG):", TRACKER_CONFIG)
 
@@ -152,8 +160,12 @@ def dibujar_estadisticas_consola(tiempo_permanencia, NOMBRES_ZONAS, fps_text, pr
             row_str += "{:<8}".format(tiempo_str)
         print(row_str)
 
-def guardar_recorte_y_log(im0, bbox, track_id, idLog_contador, tiempo_permanencia, NOMBRES_ZONAS, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG):
-    """Guarda el recorte de la persona en su subcarpeta ID y añade una línea al log de detecciones."""
+def guardar_recorte_y_log(im0, bbox, track_id, idLog_contador, tiempo_permanencia, NOMBRES_ZONAS, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG,
+                          frame_contador=0, log_binario=None):
+    """
+    Guarda el recorte de la persona en su subcarpeta ID y añade una línea al log de detecciones.
+    Si se recibe un log binario, el registro se añade a éste con los tiempos sin redondear en vez de al CSV.
+    """
     
     id_entero = track_id
     id_str = str(id_entero)
@@ -180,6 +192,11 @@ def guardar_recorte_y_log(im0, bbox, track_id, idLog_contador, tiempo_permanenci
     cv2.imwrite(ruta_archivo, recorte)
     
     # Genera línea de LOG
+    if log_binario is not None:
+        tiempos = [tiempo_permanencia[track_id].get(zona, 0) for zona in NOMBRES_ZONAS]
+        log_binario.anadir(idLog_contador, id_entero, frame_contador, tiempos)
+        return idLog_contador + 1
+
     # Obtenemos los tiempos de permanencia de la persona actual
     # Usamos el track_id (que es el ID de la persona) como clave para buscar los tiempos
     tiempos = [round(tiempo_permanencia[track_id].get(zona, 0), 2) for zona in NOMBRES_ZONAS]
@@ -199,14 +216,21 @@ def guardar_recorte_y_log(im0, bbox, track_id, idLog_contador, tiempo_permanenci
 # --- INICIALIZACIÓN DE COMPONENTES ---
 #######################################
 
-def inicializar_sistema(SOURCE, MODELO_DETECCION, OUTPUT_VIDEO_FILE, NOMBRES_ZONAS, GENERAR_VIDEO_ETIQUETADO, GUARDAR_HIL_ID, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, FRAMES_IGNORADOS):
+def inicializar_sistema(SOURCE, MODELO_DETECCION, OUTPUT_VIDEO_FILE, NOMBRES_ZONAS, GENERAR_VIDEO_ETIQUETADO, GUARDAR_HIL_ID, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, FRAMES_IGNORADOS, model=None, ZONAS=None,
+                        FORMATO_LOG_HIL="csv"):
     """
     Inicializa modelo, captura de video, escritor de video, y define zonas.
     Calcula el tiempo de muestreo corregido si existe ajuste para saltar frames
+    Si se recibe un modelo ya cargado (modo servicio) se reutiliza en vez de volver a cargar los pesos
+    Si se reciben las zonas ya definidas se usan éstas en vez de la cuadrícula 2x2
+    El encabezado del log CSV sólo se crea si el formato del log es CSV
     """
+
+    comprobar_formato_log(FORMATO_LOG_HIL)
     
     # Inicializar el modelo YOLO
-    model = YOLO(MODELO_DETECCION)
+    if model is None:
+        model = YOLO(MODELO_DETECCION)
 
     # Inicializar la captura de video
     cap = cv2.VideoCapture(SOURCE)
@@ -251,14 +275,19 @@ def inicializar_sistema(SOURCE, MODELO_DETECCION, OUTPUT_VIDEO_FILE, NOMBRES_ZON
         if not os.path.exists(OUTPUT_HIL_DIR):
             os.makedirs(OUTPUT_HIL_DIR)
         
-        # Crear encabezados del log principal
-        headers = ["idLog", "idPersona"] + ["zona{}".format(i) for i in range(1, len(NOMBRES_ZONAS) + 1)]
-        with open(OUTPUT_HIL_LOG, 'w', newline='') as f:
-            writer_log = csv.writer(f)
-            writer_log.writerow(headers)
+        # Crear encabezados del log principal (en formato binario lo crea EscritorLogBinario)
+        if FORMATO_LOG_HIL == "csv":
+            headers = ["idLog", "idPersona"] + ["zona{}".format(i) for i in range(1, len(NOMBRES_ZONAS) + 1)]
+            with open(OUTPUT_HIL_LOG, 'w', newline='') as f:
+                writer_log = csv.writer(f)
+                writer_log.writerow(headers)
         print("Carpeta principal y log de HIL_ID creados en: {}".format(OUTPUT_HIL_DIR))
 
     # Definición de ZONAS
+    if ZONAS is not None:
+        print("Dimensiones de la ventana: {}x{}. {} zonas recibidas.".format(W, H, len(ZONAS)))
+        return model, cap, writer, ZONAS, TIEMPO_DE_MUESTREO_CORREGIDO, TOTAL_FRAMES
+
     # Para las pruebas del prototipo se simplificará en una cuadricula de 2 X 2
     HALF_W = W // 2
     HALF_H = H // 2
@@ -279,7 +308,8 @@ def inicializar_sistema(SOURCE, MODELO_DETECCION, OUTPUT_VIDEO_FILE, NOMBRES_ZON
 
 def procesar_frame(im0, model, TRACKER_CONFIG, CLASES_DE_INTERES, UMBRAL_CONFIANZA, 
                           RESOLUCION_FOTOGRAMA, ZONAS, TIEMPO_DE_MUESTREO_CORREGIDO, tiempo_permanencia,
-                          GUARDAR_HIL_ID, idLog_contador, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, NOMBRES_ZONAS):
+                          GUARDAR_HIL_ID, idLog_contador, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, NOMBRES_ZONAS,
+                          frame_contador=0, log_binario=None):
     """Realiza la detección, tracking, cálculo de permanencia y etiqueta el frame."""
 
     # Configuramos los parámetros del seguimiento de objetos y el tracker
@@ -321,7 +351,7 @@ def procesar_frame(im0, model, TRACKER_CONFIG, CLASES_DE_INTERES, UMBRAL_CONFIAN
             if GUARDAR_HIL_ID:
                 idLog_contador = guardar_recorte_y_log(
                     im0, bbox, track_id, idLog_contador, tiempo_permanencia, 
-                    NOMBRES_ZONAS, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG
+                    NOMBRES_ZONAS, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, frame_contador, log_binario
                 )
             
 
@@ -344,6 +374,7 @@ def main():
 
     cap = None
     writer = None
+    log_binario = None
     tiempo_permanencia = defaultdict(lambda: {nombre: 0 for nombre in NOMBRES_ZONAS}) 
     totalFramesIgnorados = 0 
     tiempo_previo = time.time() # usado para el cálculo de FPS de rendimiento
@@ -360,12 +391,16 @@ def main():
         # contiene el tiempo real en segundos representado por cada frame procesado
         model, cap, writer, ZONAS, TIEMPO_DE_MUESTREO_CORREGIDO, TOTAL_FRAMES = inicializar_sistema(
             SOURCE, MODELO_DETECCION, OUTPUT_VIDEO_FILE, NOMBRES_ZONAS, GENERAR_VIDEO_ETIQUETADO, 
-            GUARDAR_HIL_ID, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, FRAMES_IGNORADOS
+            GUARDAR_HIL_ID, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, FRAMES_IGNORADOS, FORMATO_LOG_HIL=FORMATO_LOG_HIL
         )
     except ValueError as e:
         print("Se produzco un error: {}".format(e))
         return
 
+    # Log de detecciones en formato binario, si así ha sido establecido
+    if GUARDAR_HIL_ID and FORMATO_LOG_HIL == "binario":
+        log_binario = EscritorLogBinario(OUTPUT_HIL_LOG_BIN, ["zona{}".format(i) for i in range(1, len(NOMBRES_ZONAS) + 1)])
+
     # --- BUCLE PRINCIPAL DE PROCESAMIENTO DE VIDEO ---
     try:
 
@@ -405,7 +440,8 @@ def main():
             im0_etiquetada, tiempo_permanencia, idLog_contador = procesar_frame(
                 im0, model, TRACKER_CONFIG, CLASES_DE_INTERES, UMBRAL_CONFIANZA, 
                 RESOLUCION_FOTOGRAMA, ZONAS, TIEMPO_DE_MUESTREO_CORREGIDO, tiempo_permanencia, 
-                GUARDAR_HIL_ID, idLog_contador, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, NOMBRES_ZONAS
+                GUARDAR_HIL_ID, idLog_contador, OUTPUT_HIL_DIR, OUTPUT_HIL_LOG, NOMBRES_ZONAS,
+                frame_contador, log_binario
             )
             
             altura_frame = im0_etiquetada.shape[0]    
@@ -476,6 +512,10 @@ def main():
         
         if PRINT_PANTALLA:
             cv2.destroyAllWindows()
+
+        # Vuelca a disco el último bloque del log binario
+        if log_binario is not None:
+            log_binario.cerrar()
         
         guardar_csv(tiempo_permanencia, NOMBRES_ZONAS, OUTPUT_CSV_FILE, totalFramesIgnorados)
         print("FIN DEL PROCESAMIENTO, los recursos han sido liberados.")
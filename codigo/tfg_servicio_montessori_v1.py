@@ -0,0 +1,401 @@
+######################################
+# --- PROYECTO PARA TFG DE LA UNIR ---
+# Autor: Francisco Javier Ortiz Gonzalez
+# Fecha: Diciembre, 2025
+# Licencia: AGPL_v3
+######################################
+
+# MODO SERVICIO: mantiene el modelo YOLO cargado y "caliente" en memoria y atiende
+# trabajos de procesamiento recibidos a través de un socket local.
+# Así se evita pagar en cada video la importación de ultralytics/torch, la carga de pesos
+# y la primera inferencia de calentamiento.
+#
+# Los trabajos se envían, consultan y detienen con el cliente tfg_cliente_servicio_v1.py
+#
+# Ejemplo de trabajo.json (todas las claves salvo "source" son opcionales).
+# Si no se indican rutas de salida, cada trabajo genera las suyas a partir del nombre del video,
+# la hora de encolado y su id, para que los trabajos no se sobrescriban entre sí:
+#   estadisticas/<clip>_<fecha>_<id>.csv, videos/<clip>_<fecha>_<id>_etiquetado.mp4, HIL_ID_<clip>_<fecha>_<id>/
+#   {"source": "D:/videos/clip1.mp4",
+#    "zonas": {"ZONA1": [[0,0],[320,0],[320,240],[0,240]], "ZONA2": [[320,0],[640,0],[640,240],[320,240]]},
+#    "tracker_config": "D:/TFG/trackers/tracker_botsort_tfg_montessori_v1.yaml",
+#    "output_csv_file": "D:/TFG/estadisticas/clip1.csv",
+#    "output_video_file": "D:/TFG/videos/clip1_etiquetado.mp4",
+#    "output_hil_dir": "D:/TFG/HIL_ID_clip1",
+#    "generar_video_etiquetado": true, "guardar_hil_id": true, "formato_log_hil": "binario", "frames_ignorados": 0}
+
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import tfg_montessori_v10 as tfg
+from tfg_log_binario_v1 import EscritorLogBinario, comprobar_formato_log
+
+##################################
+# --- PARAMETROS CONFIGURABLES ---
+##################################
+
+# Dirección del socket local donde escucha el servicio (sólo accesible desde la propia máquina)
+HOST_SERVICIO = "127.0.0.1"
+PUERTO_SERVICIO = 50505
+
+# Número máximo de bytes aceptados por petición
+TAMANO_MAXIMO_PETICION = 1024 * 1024
+
+# Estados posibles de un trabajo
+ESTADO_EN_COLA = "en_cola"
+ESTADO_PROCESANDO = "procesando"
+ESTADO_COMPLETADO = "completado"
+ESTADO_INTERRUMPIDO = "interrumpido"
+ESTADO_CANCELADO = "cancelado"
+ESTADO_ERROR = "error"
+
+
+###############################
+# --- FUNCIONES AUXILIARES ---
+###############################
+
+def cargar_modelo_caliente(MODELO_DETECCION, TRACKER_CONFIG, RESOLUCION_FOTOGRAMA):
+    """
+    Carga el modelo YOLO una única vez y realiza una inferencia de calentamiento sobre un frame vacío,
+    de forma que el primer frame del primer trabajo ya no paga ese coste.
+    """
+
+    print("Cargando modelo de detección: {}".format(MODELO_DETECCION))
+    hora_inicio = time.time()
+
+    model = tfg.YOLO(MODELO_DETECCION)
+
+    # Inferencia de calentamiento con el mismo modo (track) que usará el procesamiento real
+    frame_vacio = np.zeros((RESOLUCION_FOTOGRAMA, RESOLUCION_FOTOGRAMA, 3), dtype=np.uint8)
+    model.track(frame_vacio, persist=True, tracker=TRACKER_CONFIG, classes=tfg.CLASES_DE_INTERES,
+                verbose=False, imgsz=RESOLUCION_FOTOGRAMA, save=False)
+
+    print("Modelo cargado y calentado en {:.2f} segundos".format(time.time() - hora_inicio))
+    return model
+
+def reiniciar_tracker(model, TRACKER_CONFIG, tracker_config_anterior):
+    """
+    Deja el tracker limpio antes de cada trabajo para que los IDs vuelvan a empezar en 1
+    y no se arrastren pistas de un video a otro.
+    Si el trabajo usa otra configuración de tracker se descarta el predictor (los pesos siguen en memoria)
+    para que ultralytics cree los trackers nuevos con el archivo indicado.
+    """
+
+    if TRACKER_CONFIG != tracker_config_anterior:
+        model.predictor = None
+        model.reset_callbacks()
+        return
+
+    for tracker in getattr(model.predictor, "trackers", []):
+        tracker.reset()
+
+def construir_zonas(zonas_trabajo):
+    """Convierte las zonas recibidas en el trabajo {nombre: [[x, y], ...]} en polígonos de OpenCV."""
+    return {nombre: np.array(puntos, dtype=np.int32) for nombre, puntos in zonas_trabajo.items()}
+
+def nuevo_trabajo(id_trabajo, peticion):
+    """Crea la ficha de un trabajo completando con los valores por defecto del prototipo lo que no venga en la petición."""
+
+    if "source" not in peticion:
+        raise ValueError("El trabajo debe indicar el video a procesar (source).")
+
+    formato_log_hil = peticion.get("formato_log_hil", tfg.FORMATO_LOG_HIL)
+    comprobar_formato_log(formato_log_hil)
+
+    # Prefijo único del trabajo para las rutas de salida por defecto
+    # Los recortes van en una carpeta hermana de HIL_ID y no dentro, para que la fusión de HIL_ID no los mezcle
+    hora_encolado = time.time()
+    if peticion["source"] == 0:
+        nombre_clip = "webcam"
+    else:
+        nombre_clip = os.path.splitext(os.path.basename(str(peticion["source"])))[0]
+    prefijo = "{}_{}_{}".format(nombre_clip, time.strftime("%Y%m%d_%H%M%S", time.localtime(hora_encolado)), id_trabajo)
+
+    output_hil_dir = peticion.get("output_hil_dir", "{}_{}".format(tfg.OUTPUT_HIL_DIR, prefijo))
+
+    return {
+        "id": id_trabajo,
+        "estado": ESTADO_EN_COLA,
+        "source": peticion["source"],
+        "zonas": peticion.get("zonas"),
+        "tracker_config": peticion.get("tracker_config", tfg.TRACKER_CONFIG),
+        "output_csv_file": peticion.get("output_csv_file",
+                                        os.path.join(os.path.dirname(tfg.OUTPUT_CSV_FILE), prefijo + ".csv")),
+        "output_video_file": peticion.get("output_video_file",
+                                          os.path.join(os.path.dirname(tfg.OUTPUT_VIDEO_FILE), prefijo + "_etiquetado.mp4")),
+        "output_hil_dir": output_hil_dir,
+        "output_hil_log": peticion.get("output_hil_log", os.path.join(output_hil_dir, "id_detection_log.csv")),
+        "output_hil_log_bin": peticion.get("output_hil_log_bin", os.path.join(output_hil_dir, "id_detection_log.bin")),
+        "formato_log_hil": formato_log_hil,
+        "generar_video_etiquetado": peticion.get("generar_video_etiquetado", tfg.GENERAR_VIDEO_ETIQUETADO),
+        "guardar_hil_id": peticion.get("guardar_hil_id", tfg.GUARDAR_HIL_ID),
+        "frames_ignorados": peticion.get("frames_ignorados", tfg.FRAMES_IGNORADOS),
+        "frames_procesados": 0,
+        "frames_totales": 0,
+        "progreso": 0.0,
+        "hora_encolado": hora_encolado,
+        "hora_inicio": None,
+        "hora_fin": None,
+        "tiempo_espera": None,
+        "tiempo_procesamiento": None,
+        "fps_medio": None,
+        "error": None,
+    }
+
+
+##################################
+# --- PROCESAMIENTO DE TRABAJOS ---
+##################################
+
+def ejecutar_trabajo(model, trabajo, evento_parada):
+    """
+    Procesa un video completo reutilizando el modelo ya cargado.
+    Sigue el mismo bucle que el prototipo pero sin ventana ni estadísticas por consola.
+    Si se activa evento_parada se detiene en el siguiente frame guardando los resultados parciales.
+    Devuelve True si el trabajo fue interrumpido.
+    """
+
+    interrumpido = False
+
+    cap = None
+    writer = None
+    log_binario = None
+    frame_contador = 0
+    totalFramesIgnorados = 0
+    idLog_contador = 1
+
+    GENERAR_VIDEO_ETIQUETADO = trabajo["generar_video_etiquetado"]
+    GUARDAR_HIL_ID = trabajo["guardar_hil_id"]
+    FRAMES_IGNORADOS = trabajo["frames_ignorados"]
+
+    # Si el trabajo define sus zonas se usan sus nombres, en caso contrario la cuadrícula 2x2 del prototipo
+    NOMBRES_ZONAS = list(trabajo["zonas"]) if trabajo["zonas"] else tfg.NOMBRES_ZONAS
+    ZONAS = construir_zonas(trabajo["zonas"]) if trabajo["zonas"] else None
+    tiempo_permanencia = defaultdict(lambda: {nombre: 0 for nombre in NOMBRES_ZONAS})
+
+    try:
+        model, cap, writer, ZONAS, TIEMPO_DE_MUESTREO_CORREGIDO, TOTAL_FRAMES = tfg.inicializar_sistema(
+            trabajo["source"], tfg.MODELO_DETECCION, trabajo["output_video_file"], NOMBRES_ZONAS,
+            GENERAR_VIDEO_ETIQUETADO, GUARDAR_HIL_ID, trabajo["output_hil_dir"], trabajo["output_hil_log"],
+            FRAMES_IGNORADOS, model=model, ZONAS=ZONAS, FORMATO_LOG_HIL=trabajo["formato_log_hil"]
+        )
+
+        if GUARDAR_HIL_ID and trabajo["formato_log_hil"] == "binario":
+            log_binario = EscritorLogBinario(trabajo["output_hil_log_bin"],
+                                             ["zona{}".format(i) for i in range(1, len(NOMBRES_ZONAS) + 1)])
+
+        trabajo["frames_totales"] = TOTAL_FRAMES
+
+        while cap.isOpened():
+            if evento_parada.is_set():
+                print("\n--- Servicio detenido. Guardando progreso del trabajo {}... ---".format(trabajo["id"]))
+                interrumpido = True
+                break
+
+            success, im0 = cap.read()
+            if not success:
+                break
+
+            frame_contador += 1
+
+            # SALTEO DE FRAMES si así ha sido establecido
+            if FRAMES_IGNORADOS > 0 and (frame_contador % (FRAMES_IGNORADOS + 1) != 0):
+                if GENERAR_VIDEO_ETIQUETADO:
+                    writer.write(im0)
+                totalFramesIgnorados += 1
+                continue
+
+            im0_etiquetada, tiempo_permanencia, idLog_contador = tfg.procesar_frame(
+                im0, model, trabajo["tracker_config"], tfg.CLASES_DE_INTERES, tfg.UMBRAL_CONFIANZA,
+                tfg.RESOLUCION_FOTOGRAMA, ZONAS, TIEMPO_DE_MUESTREO_CORREGIDO, tiempo_permanencia,
+                GUARDAR_HIL_ID, idLog_contador, trabajo["output_hil_dir"], trabajo["output_hil_log"], NOMBRES_ZONAS,
+                frame_contador, log_binario
+            )
+
+            if GENERAR_VIDEO_ETIQUETADO:
+                writer.write(im0_etiquetada)
+
+            trabajo["frames_procesados"] = frame_contador
+            if TOTAL_FRAMES > 0:
+                trabajo["progreso"] = round((frame_contador / TOTAL_FRAMES) * 100, 1)
+
+    finally:
+        if writer is not None:
+            writer.release()
+
+        if log_binario is not None:
+            log_binario.cerrar()
+
+        # Sólo se guardan estadísticas si el video llegó a abrirse
+        if cap is not None:
+            cap.release()
+            tfg.guardar_csv(tiempo_permanencia, NOMBRES_ZONAS, trabajo["output_csv_file"], totalFramesIgnorados)
+
+    return interrumpido
+
+def bucle_trabajos(model, cola_trabajos, trabajos, evento_parada):
+    """
+    Atiende la cola de trabajos de uno en uno.
+    Los trabajos se procesan en serie porque el modelo y su tracker son únicos y guardan estado entre frames.
+    """
+
+    tracker_config_anterior = tfg.TRACKER_CONFIG
+
+    while True:
+        id_trabajo = cola_trabajos.get()
+        if id_trabajo is None:   # señal de parada
+            break
+
+        trabajo = trabajos[id_trabajo]
+        if evento_parada.is_set():
+            trabajo["estado"] = ESTADO_CANCELADO
+            continue
+
+        trabajo["estado"] = ESTADO_PROCESANDO
+        trabajo["hora_inicio"] = time.time()
+        trabajo["tiempo_espera"] = round(trabajo["hora_inicio"] - trabajo["hora_encolado"], 3)
+        print("\n--- Iniciando trabajo {}: {} ---".format(id_trabajo, trabajo["source"]))
+
+        try:
+            reiniciar_tracker(model, trabajo["tracker_config"], tracker_config_anterior)
+            tracker_config_anterior = trabajo["tracker_config"]
+            interrumpido = ejecutar_trabajo(model, trabajo, evento_parada)
+            trabajo["estado"] = ESTADO_INTERRUMPIDO if interrumpido else ESTADO_COMPLETADO
+        except Exception as e:
+            trabajo["estado"] = ESTADO_ERROR
+            trabajo["error"] = str(e)
+            # Ante un error no sabemos en qué estado ha quedado el predictor, se fuerza su recreación
+            tracker_config_anterior = None
+            print("Se produjo un error en el trabajo {}: {}".format(id_trabajo, e))
+
+        trabajo["hora_fin"] = time.time()
+        trabajo["tiempo_procesamiento"] = round(trabajo["hora_fin"] - trabajo["hora_inicio"], 3)
+        if trabajo["tiempo_procesamiento"] > 0:
+            trabajo["fps_medio"] = round(trabajo["frames_procesados"] / trabajo["tiempo_procesamiento"], 2)
+
+        print("--- Trabajo {} {} en {:.2f} segundos (espera en cola: {:.2f} segundos) ---".format(
+            id_trabajo, trabajo["estado"], trabajo["tiempo_procesamiento"], trabajo["tiempo_espera"]))
+
+
+###########################
+# --- SERVIDOR DE SOCKET ---
+###########################
+
+class ManejadorPeticiones(socketserver.StreamRequestHandler):
+    """Atiende una petición JSON por conexión (una línea) y responde con otra línea JSON."""
+
+    def handle(self):
+        servidor = self.server
+        try:
+            linea = self.rfile.readline(TAMANO_MAXIMO_PETICION)
+            peticion = json.loads(linea.decode("utf-8"))
+            respuesta = atender_peticion(servidor, peticion)
+        except (ValueError, KeyError, TypeError) as e:
+            respuesta = {"ok": False, "error": str(e)}
+
+        self.wfile.write((json.dumps(respuesta) + "\n").encode("utf-8"))
+
+class ServidorMontessori(socketserver.ThreadingTCPServer):
+    """Servidor TCP local que comparte la cola y el registro de trabajos entre las conexiones."""
+
+    # En Windows SO_REUSEADDR permite que una segunda instancia escuche en el mismo puerto sin error,
+    # por lo que sólo se activa en el resto de sistemas (donde únicamente evita esperar tras cerrar el servicio)
+    allow_reuse_address = os.name != "nt"
+    daemon_threads = True
+
+    def __init__(self, direccion, cola_trabajos):
+        super().__init__(direccion, ManejadorPeticiones)
+        self.cola_trabajos = cola_trabajos
+        self.trabajos = {}
+        self.bloqueo = threading.Lock()
+        self.siguiente_id = 1
+
+def atender_peticion(servidor, peticion):
+    """Ejecuta la acción solicitada: encolar un trabajo, consultar su estado o detener el servicio."""
+
+    if not isinstance(peticion, dict):
+        return {"ok": False, "error": "La petición debe ser un objeto JSON."}
+
+    accion = peticion.get("accion")
+
+    if accion == "procesar":
+        with servidor.bloqueo:
+            id_trabajo = servidor.siguiente_id
+            servidor.trabajos[id_trabajo] = nuevo_trabajo(id_trabajo, peticion)
+            servidor.siguiente_id += 1
+        servidor.cola_trabajos.put(id_trabajo)
+        print("Trabajo {} encolado: {}".format(id_trabajo, peticion["source"]))
+        return {"ok": True, "id": id_trabajo}
+
+    if accion == "estado":
+        if "id" in peticion:
+            trabajo = servidor.trabajos.get(int(peticion["id"]))
+            if trabajo is None:
+                return {"ok": False, "error": "No existe el trabajo {}".format(peticion["id"])}
+            return {"ok": True, "trabajos": [trabajo]}
+        return {"ok": True, "trabajos": list(servidor.trabajos.values())}
+
+    if accion == "detener":
+        # Se cierra desde otro hilo porque shutdown() espera a que termine serve_forever()
+        threading.Thread(target=servidor.shutdown).start()
+        return {"ok": True}
+
+    return {"ok": False, "error": "Acción desconocida: {}".format(accion)}
+
+################################
+# --- MAIN PRINCIPAL SERVICIO ---
+################################
+
+def main():
+
+    # Se reserva el puerto antes de cargar el modelo para detectar enseguida otra instancia en marcha
+    cola_trabajos = queue.Queue()
+    try:
+        servidor = ServidorMontessori((HOST_SERVICIO, PUERTO_SERVICIO), cola_trabajos)
+    except OSError as e:
+        print("Error: el puerto {}:{} está en uso, ¿hay otra instancia del servicio en marcha? ({})".format(
+            HOST_SERVICIO, PUERTO_SERVICIO, e))
+        return
+
+    # Carga única del modelo
+    try:
+        model = cargar_modelo_caliente(tfg.MODELO_DETECCION, tfg.TRACKER_CONFIG, tfg.RESOLUCION_FOTOGRAMA)
+    except BaseException:
+        servidor.server_close()
+        raise
+
+    evento_parada = threading.Event()
+    hilo_trabajos = threading.Thread(target=bucle_trabajos, args=(model, cola_trabajos, servidor.trabajos, evento_parada))
+    hilo_trabajos.start()
+
+    print("Servicio escuchando en {}:{}. Ctrl+C para detener.".format(HOST_SERVICIO, PUERTO_SERVICIO))
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n--- El usuario interrumpió el servicio desde consola (Ctrl+C) ---")
+    finally:
+        servidor.server_close()
+
+        # Se interrumpe el trabajo en curso (guarda resultados parciales) y se cancelan los pendientes
+        evento_parada.set()
+        while not cola_trabajos.empty():
+            id_trabajo = cola_trabajos.get_nowait()
+            servidor.trabajos[id_trabajo]["estado"] = ESTADO_CANCELADO
+        cola_trabajos.put(None)
+
+        while hilo_trabajos.is_alive():
+            try:
+                hilo_trabajos.join(0.5)
+            except KeyboardInterrupt:
+                print("Esperando a que el trabajo en curso guarde sus resultados...")
+        print("FIN DEL SERVICIO, los recursos han sido liberados.")
+
+if __name__ == "__main__":
+    main()